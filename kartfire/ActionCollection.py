@@ -24,6 +24,9 @@ from .Exceptions import NoSuchCollectionException
 from .CmdlineAction import CmdlineAction
 
 class ActionCollection(CmdlineAction):
+	# Smaller edits are left to the "PRAGMA optimize" that close() runs
+	_ANALYZE_MIN_CHANGED_TC_IDS = 1000
+
 	def run(self):
 		collection = None
 		with contextlib.suppress(NoSuchCollectionException):
@@ -44,8 +47,11 @@ class ActionCollection(CmdlineAction):
 					self._db.remove_tc_ids_from_collection(self._args.collection_name, tc_ids)
 				else:
 					self._db.add_tc_ids_to_collection(self._args.collection_name, tc_ids)
+				if len(tc_ids) >= self._ANALYZE_MIN_CHANGED_TC_IDS:
+					# Collection contents changed in bulk, refresh the planner statistics
+					self._db.analyze()
 			collection = self._db.get_testcase_collection(self._args.collection_name)
 
-		self._db.commit()
+		self._db.close()
 		print(collection)
 		return 0
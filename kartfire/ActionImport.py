@@ -44,3 +44,6 @@ class ActionImport(CmdlineAction):
 	def run(self):
 		for filename in self._args.testcase_filename:
 			self._import(filename)
+		self._db.checkpoint()
+		self._db.analyze()
+		self._db.close()
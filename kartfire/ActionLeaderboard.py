@@ -28,13 +28,15 @@ from .Leaderboard import Leaderboard
 class ActionLeaderboard(CmdlineAction):
 	def _print_cli(self):
 		for leaderboard in self._leaderboards:
-			print(f"Best runs for collection {self._args.collection_name} with all pass results, reftime {leaderboard.collection.reference_runtime_secs:.2f} sec")
+			reference_runtime_secs = leaderboard.collection.reference_runtime_secs
+			reftime_text = "n/a" if (reference_runtime_secs is None) else f"{reference_runtime_secs:.2f} sec"
+			print(f"Best runs for collection {self._args.collection_name} with all pass results, reftime {reftime_text}")
 
 			table = Table()
 			table.format_columns({
 				"time":			CellFormatter(align = CellFormatter.Alignment.Right, content_to_str_fnc = lambda content: f"{content:.1f}"),
-				"reltime":		CellFormatter(align = CellFormatter.Alignment.Right, content_to_str_fnc = lambda content: f"{content:6.1f}%"),
-				"relfactor":	CellFormatter(align = CellFormatter.Alignment.Right, content_to_str_fnc = lambda content: f"{content:.1f}x"),
+				"reltime":		CellFormatter(align = CellFormatter.Alignment.Right, content_to_str_fnc = lambda content: "n/a" if (content is None) else f"{content:6.1f}%"),
+				"relfactor":	CellFormatter(align = CellFormatter.Alignment.Right, content_to_str_fnc = lambda content: "n/a" if (content is None) else f"{content:.1f}x"),
 				"loc":			CellFormatter(align = CellFormatter.Alignment.Right),
 			})
 			table.add_row({
@@ -62,8 +64,8 @@ class ActionLeaderboard(CmdlineAction):
 					"source":		source,
 					"run_id":		entry["run_id"],
 					"time":			entry["min_runtime_secs"],
-					"reltime":		entry["reltime"] * 100,
-					"relfactor":	1 / entry["reltime"],
+					"reltime":		None if (entry["reltime"] is None) else (entry["reltime"] * 100),
+					"relfactor":	(1 / entry["reltime"]) if entry["reltime"] else None,
 					"loc":			entry["loc"],
 					"language":		entry["language_breakdown_text"],
 				})
@@ -42,8 +42,7 @@ class ActionReference(CmdlineAction):
 
 			self._db.set_reference_runtime(run_result.collection_name, run_result.runtime.duration_secs)
 			cases = run_result.test_failures if self._args.pick_failed_answers else run_result.test_indeterminates
-			for reference_testcase in cases:
-				self._db.set_reference_answer(reference_testcase["tc_id"], reference_testcase["received_reply"])
-				self._db.opportunistic_commit()
-		self._db.commit()
+			self._db.set_reference_answers([ (reference_testcase["tc_id"], reference_testcase["received_reply"]) for reference_testcase in cases ])
+			self._db.opportunistic_commit()
+		self._db.close()
 		return 0
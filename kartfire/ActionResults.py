@@ -76,9 +76,7 @@ class ActionResults(CmdlineAction):
 
 	def _show_solutions(self):
 		results = self._db.get_most_recent_multirun_by_source(filter_source = self._args.filter_source, filter_submitter_name = self._args.filter_submitter_name, limit = self._args.limit)
-		multiruns = [ ]
-		for result in results:
-			multiruns.append(MultiRunResult(self._db, result["multirun_id"]))
+		multiruns = MultiRunResult.load_many(self._db, [ result["multirun_id"] for result in results ])
 		if self._args.filter_failures:
 			multiruns = [ multirun for multirun in multiruns if not multirun.all_pass ]
 		self._print_multiruns(multiruns)
@@ -90,6 +90,9 @@ class ActionWatch(CmdlineAction):
 			else:
 				print("All submissions were run in this cycle.")
 
+			# Long-running process, keep the planner statistics current
+			self._db.optimize()
+
 
 	def _multirun_finished_callback(self, submission: Submission, multirun_id: int):
 		print(f"Finished testing submission: {submission}")
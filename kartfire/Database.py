@@ -20,7 +20,7 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 import sqlite3
-import json
+import array
 import contextlib
 import datetime
 import collections
@@ -32,11 +32,42 @@ from .Enums import TestrunStatus, TestresultStatus
 from .Exceptions import NoSuchCollectionException, NoDatabaseFoundException
 
 class Database(SqliteORM):
-	def __init__(self, filename: str):
+	# Statement texts are fixed per flag value so that they are not rebuilt on
+	# every call and always hit the same entry in the statement cache
+	_SQL_MULTIRUN_OVERVIEW = {
+		False:	"SELECT multirun_id, source, source_metadata, environment_metadata, build_start_utcts, build_end_utcts, build_runtime_secs, build_runtime_allowance_secs, build_status, build_error_details FROM multirun WHERE multirun_id = ?;",
+		True:	"SELECT multirun.* FROM multirun WHERE multirun_id = ?;",
+	}
+	_SQL_RUN_OVERVIEW = {
+		False:	"SELECT run_id, multirun_id, collection, run_start_utcts, run_end_utcts, runtime_secs, runtime_secs_container, testcase_count, runtime_allowance_secs, max_permissible_ram_mib, status, error_details, testcollection.reference_runtime_secs FROM testrun LEFT JOIN testcollection ON testcollection.name = testrun.collection WHERE run_id = ?;",
+		True:	"SELECT testrun.*, testcollection.reference_runtime_secs FROM testrun LEFT JOIN testcollection ON testcollection.name = testrun.collection WHERE run_id = ?;",
+	}
+	_SQL_RUN_FAILURES = {
+		False:	"SELECT testcases.tc_id, status, testcases.action, testcases.arguments, correct_reply, received_reply FROM testfailure JOIN testcases ON testcases.tc_id = testfailure.tc_id WHERE (run_id = ?);",
+		True:	"SELECT testcases.tc_id, status, testcases.action, testcases.arguments, correct_reply, received_reply FROM testfailure JOIN testcases ON testcases.tc_id = testfailure.tc_id WHERE (run_id = ?) AND (status = 'indeterminate');",
+	}
+
+	# Result counts are read for every run shown, resolve their status without
+	# going through the enum constructor
+	_TESTRESULT_STATUS_BY_VALUE = { member.value: member for member in TestresultStatus }
+
+	_SYNCHRONOUS_BY_DURABILITY = {
+		"strict":	"FULL",				# fsync on every commit
+		"relaxed":	"NORMAL",			# fsync on WAL checkpoint only, a power loss might lose the last commits
+		"none":		"OFF",				# never fsync, a power loss might corrupt the database
+	}
+
+	def __init__(self, filename: str, durability: str = "relaxed"):
+		if durability not in self._SYNCHRONOUS_BY_DURABILITY:
+			raise ValueError(f"Unknown durability level: {durability}")
 		if not os.path.isfile(filename):
 			raise NoDatabaseFoundException(f"There is no kartfire database at {filename}. Create an empty file if you want one to be created.")
 
 		super().__init__(filename)
+		self._collection_id_cache = { }
+		self._testcase_cache = collections.OrderedDict()
+		self._testcase_cache_data_version = None
+		self._max_testcase_cache_size = 16384
 		self._map_type("testcases:arguments", "json")
 		self._map_type("testcases:correct_reply", "json")
 		self._map_type("testcases:dependencies", "json")
@@ -66,6 +97,22 @@ class Database(SqliteORM):
 		# Five minutes of blocking time before giving up
 		self._cursor.execute(f"PRAGMA busy_timeout = {5 * 60 * 1000}")
 
+		# WAL is persisted in the database file, so it can only be switched on
+		# if we're allowed to write to it
+		if os.access(filename, os.W_OK):
+			self._cursor.execute("PRAGMA journal_mode = WAL")
+			# Checkpoint less often during large ingests, but truncate the WAL
+			# afterwards so it does not stay at its peak size
+			self._cursor.execute("PRAGMA wal_autocheckpoint = 10000")
+			self._cursor.execute(f"PRAGMA journal_size_limit = {64 * 1024 * 1024}")
+		self._cursor.execute(f"PRAGMA synchronous = {self._SYNCHRONOUS_BY_DURABILITY[durability]}")
+		self._cursor.execute("PRAGMA temp_store = MEMORY")
+		self._cursor.execute(f"PRAGMA cache_size = {-64 * 1024}")
+		self._cursor.execute(f"PRAGMA mmap_size = {256 * 1024 * 1024}")
+
+		# Keep ANALYZE cheap even on large tables by only sampling
+		self._cursor.execute("PRAGMA analysis_limit = 1000")
+
 		with contextlib.suppress(sqlite3.OperationalError):
 			self._cursor.execute("""\
 			CREATE TABLE testcases (
@@ -79,6 +126,11 @@ class Database(SqliteORM):
 			);
 			""")
 
+		# Much narrower than the UNIQUE(action, arguments) index and still covers
+		# action selectors since tc_id is the rowid
+		with contextlib.suppress(sqlite3.OperationalError):
+			self._cursor.execute("CREATE INDEX testcases_action ON testcases(action);")
+
 		with contextlib.suppress(sqlite3.OperationalError):
 			self._cursor.execute("""\
 			CREATE TABLE testcollection (
@@ -118,11 +170,19 @@ class Database(SqliteORM):
 			self._cursor.execute("CREATE INDEX multirun_source ON multirun(source);")
 
 		with contextlib.suppress(sqlite3.OperationalError):
-			self._cursor.execute("""CREATE VIEW most_recent_multirun_by_source AS
-				SELECT multirun_id, source, source_metadata FROM (
-					SELECT multirun_id, source, build_start_utcts, source_metadata, ROW_NUMBER() OVER (PARTITION BY source ORDER BY build_start_utcts DESC) AS rowno, MAX(build_start_utcts) OVER (PARTITION BY source) AS latest_build_start FROM multirun
-				) AS subqry WHERE (subqry.latest_build_start = subqry.build_start_utcts) AND (subqry.rowno = 1)
-			;""")
+			self._cursor.execute("CREATE INDEX multirun_source_build_start_utcts ON multirun(source, build_start_utcts);")
+
+		# Generated columns added via ALTER TABLE cannot be STORED, but the index
+		# on the VIRTUAL column holds the extracted value
+		with contextlib.suppress(sqlite3.OperationalError):
+			self._cursor.execute("ALTER TABLE multirun ADD COLUMN submitter_name varchar(256) GENERATED ALWAYS AS (json_extract(source_metadata, '$.meta.json.kartfire.name')) VIRTUAL;")
+
+		with contextlib.suppress(sqlite3.OperationalError):
+			self._cursor.execute("CREATE INDEX multirun_submitter_name ON multirun(submitter_name);")
+
+		# Superseded by the query in get_most_recent_multirun_by_source()
+		with contextlib.suppress(sqlite3.OperationalError):
+			self._cursor.execute("DROP VIEW IF EXISTS most_recent_multirun_by_source;")
 
 		with contextlib.suppress(sqlite3.OperationalError):
 			self._cursor.execute("""CREATE VIEW time_spent_in_pipeline AS
@@ -153,6 +213,15 @@ class Database(SqliteORM):
 			);
 			""")
 
+		with contextlib.suppress(sqlite3.OperationalError):
+			self._cursor.execute("CREATE INDEX testrun_multirun_id ON testrun(multirun_id);")
+
+		with contextlib.suppress(sqlite3.OperationalError):
+			self._cursor.execute("CREATE INDEX testrun_run_start_utcts ON testrun(run_start_utcts);")
+
+		with contextlib.suppress(sqlite3.OperationalError):
+			self._cursor.execute("CREATE INDEX testrun_collection_runtime_secs ON testrun(collection, runtime_secs);")
+
 		with contextlib.suppress(sqlite3.OperationalError):
 			self._cursor.execute("""\
 			CREATE TABLE testcollection_testcases (
@@ -162,6 +231,10 @@ class Database(SqliteORM):
 			);
 			""")
 
+		# Lookups by collection_id are already served by the UNIQUE constraint
+		with contextlib.suppress(sqlite3.OperationalError):
+			self._cursor.execute("CREATE INDEX testcollection_testcases_tc_id ON testcollection_testcases(tc_id);")
+
 		with contextlib.suppress(sqlite3.OperationalError):
 			self._cursor.execute("""\
 			CREATE TABLE testfailure (
@@ -213,7 +286,7 @@ class Database(SqliteORM):
 			"dependencies": dependencies,
 		})
 
-	def create_multirun(self, submission: "Submission", build_constraints: "RunConstraints", container_image_metadata: "ContainerImageMetadata"):
+	def create_multirun(self, submission: "Submission", build_constraints: "RunConstraints", container_image_metadata: "ContainerImageMetadata", now: datetime.datetime | None = None):
 		env = {
 			"kartfire": kartfire.VERSION,
 			"image": container_image_metadata.to_dict(),
@@ -222,15 +295,15 @@ class Database(SqliteORM):
 			"source": submission.shortname,
 			"source_metadata": submission.to_dict(),
 			"environment_metadata": env,
-			"build_start_utcts": datetime.datetime.now(datetime.UTC),
+			"build_start_utcts": now or datetime.datetime.now(datetime.UTC),
 			"build_status": TestrunStatus.Running,
 			"build_runtime_allowance_secs": build_constraints.runtime_allowance_secs,
-		})
+		}, returning = "multirun_id")
 		return multirun_id
 
-	def update_multirun_build_status(self, multirun_id: int, exec_result: "ExecutionResult"):
+	def update_multirun_build_status(self, multirun_id: int, exec_result: "ExecutionResult", now: datetime.datetime | None = None):
 		self._mapped_execute("UPDATE multirun SET build_end_utcts = ?, build_status = ?, build_stdout = ?, build_stderr = ?, build_runtime_secs = ?, build_runtime_secs_container = ?, build_error_details = ? WHERE (multirun_id = ?);",
-								(datetime.datetime.now(datetime.UTC), "multirun:build_end_utcts"),
+								(now or datetime.datetime.now(datetime.UTC), "multirun:build_end_utcts"),
 								(exec_result.testrun_status, "multirun:build_status"),
 								(exec_result.stdout, "multirun:build_stdout"),
 								(exec_result.stderr, "multirun:build_stderr"),
@@ -240,36 +313,33 @@ class Database(SqliteORM):
 								multirun_id)
 		self._increase_uncommitted_write_count()
 
-	def create_testrun(self, multirun_id: int, testcase_collection: "TestcaseCollection", run_constraints: "RunConstraints"):
+	def create_testrun(self, multirun_id: int, testcase_collection: "TestcaseCollection", run_constraints: "RunConstraints", now: datetime.datetime | None = None):
 		run_id = self._insert("testrun", {
 			"multirun_id": multirun_id,
-			"run_start_utcts": datetime.datetime.now(datetime.UTC),
+			"run_start_utcts": now or datetime.datetime.now(datetime.UTC),
 			"testcase_count": len(testcase_collection),
 			"runtime_allowance_secs": run_constraints.runtime_allowance_secs,
 			"max_permissible_ram_mib": run_constraints.max_permissible_ram_mib,
 			"dependencies": testcase_collection.dependencies,
 			"status": TestrunStatus.Running,
 			"collection": testcase_collection.name,
-		})
+		}, returning = "run_id")
 		return run_id
 
-	def insert_testfailure(self, run_id: int, tc_id: int, test_result_status: TestresultStatus, received_reply: dict):
-		self._insert("testfailure", {
-			"run_id": run_id,
-			"tc_id": tc_id,
-			"status": test_result_status,
-			"received_reply": received_reply,
-		})
+	def insert_testfailures_bulk(self, run_id: int, testfailures: list[tuple[int, TestresultStatus, dict]]):
+		self._cursor.executemany("INSERT INTO testfailure (run_id, tc_id, status, received_reply) VALUES (?, ?, ?, ?);", (
+			(run_id, tc_id, self._map_py_to_db_value(test_result_status, "testfailure:status"), self._map_py_to_db_value(received_reply, "testfailure:received_reply"))
+			for (tc_id, test_result_status, received_reply) in testfailures))
+		self._increase_uncommitted_write_count(len(testfailures))
 
-	def insert_testsummary(self, run_id: int, test_result_status: TestresultStatus, count: int):
-		self._insert("testsummary", {
-			"run_id": run_id,
-			"status": test_result_status,
-			"count": count,
-		})
+	def insert_testsummaries_bulk(self, run_id: int, testsummaries: list[tuple[TestresultStatus, int]]):
+		self._cursor.executemany("INSERT INTO testsummary (run_id, status, count) VALUES (?, ?, ?);", (
+			(run_id, self._map_py_to_db_value(test_result_status, "testsummary:status"), count)
+			for (test_result_status, count) in testsummaries))
+		self._increase_uncommitted_write_count(len(testsummaries))
 
-	def close_testrun(self, run_id: int, exec_result: "ExecutionResult"):
-		now = datetime.datetime.now(datetime.UTC)
+	def close_testrun(self, run_id: int, exec_result: "ExecutionResult", now: datetime.datetime | None = None):
+		now = now or datetime.datetime.now(datetime.UTC)
 		self._mapped_execute("UPDATE testrun SET status = ?, error_details = ?, run_end_utcts = ?, runtime_secs = ?, runtime_secs_container = ?, stderr = ? WHERE run_id = ?;",
 							(exec_result.testrun_status, "testrun:status"),
 							(exec_result.error_details, "testrun:error_details"),
@@ -280,83 +350,124 @@ class Database(SqliteORM):
 							run_id)
 		self._increase_uncommitted_write_count()
 
-	def close_multirun(self, multirun_id: int):
-		now = datetime.datetime.now(datetime.UTC)
-		start_ts = self._mapped_execute("SELECT build_start_utcts FROM multirun WHERE multirun_id = ?;", multirun_id)._mapped_fetchone("multirun")["build_start_utcts"]
-		total_time_secs = (now - start_ts).total_seconds()
-		self._cursor.execute("UPDATE multirun SET total_time_secs = ? WHERE multirun_id = ?;", (total_time_secs, multirun_id))
-		self._increase_uncommitted_write_count()
-
-	def _get_tc_ids_for_selector_part(self, testcase_selector_part: str):
-		if testcase_selector_part.isdigit():
-			return set([ int(testcase_selector_part) ])
-		elif testcase_selector_part == "*":
-			return set(row["tc_id"] for row in self._cursor.execute("SELECT tc_id FROM testcases;").fetchall())
-		elif testcase_selector_part.startswith("@"):
-			action = testcase_selector_part[1:]
-			return set(row["tc_id"] for row in self._cursor.execute("SELECT tc_id FROM testcases WHERE action = ?;", (action, )).fetchall())
+	def close_multirun(self, multirun_id: int, now: datetime.datetime | None = None, build_start_utcts: datetime.datetime | None = None):
+		now = now or datetime.datetime.now(datetime.UTC)
+		if build_start_utcts is not None:
+			# Caller knows when the multirun started, no need to look it up
+			self._cursor.execute("UPDATE multirun SET total_time_secs = ? WHERE multirun_id = ?;", ((now - build_start_utcts).total_seconds(), multirun_id))
 		else:
-			raise NoSuchCollectionException(f"Invalid testcase selector: {testcase_selector_part}")
+			self._cursor.execute("UPDATE multirun SET total_time_secs = (julianday(?) - julianday(build_start_utcts)) * 86400.0 WHERE multirun_id = ?;", (now.isoformat(), multirun_id))
+		self._increase_uncommitted_write_count()
 
-	def get_tc_ids_by_selector(self, testcase_selector: str) -> set[int]:
-		tc_ids = set()
+	def get_tc_ids_by_selector(self, testcase_selector: str) -> array.array:
+		explicit_tc_ids = [ ]
+		actions = [ ]
+		select_all = False
 		for testcase_selector_part in [ part.strip() for part in testcase_selector.split(",") ]:
-			tc_ids |= self._get_tc_ids_for_selector_part(testcase_selector_part)
-		return tc_ids
-
-	def _get_testcase(self, tc_id: int, contained_collections: set | None = None) -> Testcase:
-		row = dict(self._cursor.execute("SELECT action, arguments, correct_reply, dependencies FROM testcases WHERE tc_id = ?;", (tc_id, )).fetchone())
-		for key in [ "arguments", "correct_reply", "dependencies" ]:
-			if row[key] is not None:
-				row[key] = json.loads(row[key])
-		row["tc_id"] = tc_id
-		row["contained_collections"] = contained_collections
-		return Testcase(**row)
+			if testcase_selector_part.isdigit():
+				explicit_tc_ids.append(int(testcase_selector_part))
+			elif testcase_selector_part == "*":
+				select_all = True
+			elif testcase_selector_part.startswith("@"):
+				actions.append(testcase_selector_part[1:])
+			else:
+				raise NoSuchCollectionException(f"Invalid testcase selector: {testcase_selector_part}")
+
+		# All parts are resolved with one single query that returns each tc_id
+		# once and in order, so it can be streamed straight into the array
+		subqueries = [ ]
+		params = [ ]
+		if select_all:
+			subqueries.append("SELECT tc_id FROM testcases")
+		elif len(actions) > 0:
+			subqueries.append(f"SELECT tc_id FROM testcases WHERE action IN ({','.join([ '?' ] * len(actions))})")
+			params += actions
+		if len(explicit_tc_ids) > 0:
+			subqueries.append(f"SELECT DISTINCT column1 FROM (VALUES {','.join([ '(?)' ] * len(explicit_tc_ids))})")
+			params += explicit_tc_ids
+		if len(subqueries) == 0:
+			return array.array("q")
+		return array.array("q", (row[0] for row in self._cursor.execute(f"{' UNION '.join(subqueries)} ORDER BY 1;", params)))
+
+	def _iter_testcases(self, where_clause: str = "", params: tuple = (), contained_collections: dict | None = None) -> iter:
+		# Writes through our own connection invalidate the cache directly, but
+		# commits by other processes (e.g., "kartfire reference" while "kartfire
+		# watch" is running) only show up as a change of the data version
+		data_version = self._conn.execute("PRAGMA data_version;").fetchone()[0]
+		if data_version != self._testcase_cache_data_version:
+			self._testcase_cache.clear()
+			self._testcase_cache_data_version = data_version
+
+		decode = self._JSON_DECODER.decode
+		# Rows are streamed, so use a dedicated cursor that is not clobbered by
+		# queries the caller might issue while iterating
+		for (tc_id, action, arguments, correct_reply, dependencies) in self._conn.execute(f"SELECT testcases.tc_id, action, arguments, correct_reply, dependencies FROM testcases {where_clause} ORDER BY testcases.tc_id ASC;", params):
+			if (contained_collections is None) and (tc_id in self._testcase_cache):
+				self._testcase_cache.move_to_end(tc_id)
+				yield self._testcase_cache[tc_id]
+				continue
+
+			testcase = Testcase(
+				tc_id = tc_id,
+				action = action,
+				arguments = decode(arguments),
+				correct_reply = None if (correct_reply is None) else decode(correct_reply),
+				dependencies = None if (dependencies is None) else decode(dependencies),
+				contained_collections = None if (contained_collections is None) else contained_collections[tc_id],
+			)
+			if contained_collections is None:
+				# Testcase is immutable, so it can safely be handed out repeatedly
+				self._testcase_cache[tc_id] = testcase
+				if len(self._testcase_cache) > self._max_testcase_cache_size:
+					self._testcase_cache.popitem(last = False)
+			yield testcase
+
+	def _table_written(self, table_name: str):
+		# Cached Testcase objects mirror rows of the testcases table
+		if table_name == "testcases":
+			self._testcase_cache.clear()
 
 	def _get_collection_id(self, collection_name: str) -> int:
+		if collection_name in self._collection_id_cache:
+			return self._collection_id_cache[collection_name]
 		collection_id = self._cursor.execute("SELECT collection_id FROM testcollection WHERE name = ? LIMIT 1 COLLATE NOCASE;", (collection_name, )).fetchone()
 		if collection_id is None:
 			raise NoSuchCollectionException(f"No such test case collection: {collection_name}")
+		self._collection_id_cache[collection_name] = collection_id["collection_id"]
 		return collection_id["collection_id"]
 
-	def add_tc_ids_to_collection(self, collection_name: str, tc_ids: set[int]) -> None:
+	def add_tc_ids_to_collection(self, collection_name: str, tc_ids: array.array) -> None:
 		collection_id = self._get_collection_id(collection_name)
-		for tc_id in tc_ids:
-			with contextlib.suppress(sqlite3.IntegrityError):
-				self._insert("testcollection_testcases", {
-					"collection_id": collection_id,
-					"tc_id": tc_id,
-				})
-
-	def remove_tc_ids_from_collection(self, collection_name: str, tc_ids: set[int]) -> None:
+		with self._savepoint("add_tc_ids"):
+			self._cursor.executemany("INSERT OR IGNORE INTO testcollection_testcases (collection_id, tc_id) VALUES (?, ?);", ((collection_id, tc_id) for tc_id in tc_ids))
+		self._increase_uncommitted_write_count(len(tc_ids))
+
+	def remove_tc_ids_from_collection(self, collection_name: str, tc_ids: array.array) -> None:
 		collection_id = self._get_collection_id(collection_name)
-		for tc_id in tc_ids:
-			self._cursor.execute("DELETE FROM testcollection_testcases WHERE (collection_id = ?) AND (tc_id = ?);", (collection_id, tc_id))
+		with self._savepoint("remove_tc_ids"):
+			self._cursor.executemany("DELETE FROM testcollection_testcases WHERE (collection_id = ?) AND (tc_id = ?);", ((collection_id, tc_id) for tc_id in tc_ids))
+		self._increase_uncommitted_write_count(len(tc_ids))
 
 	def get_testcase_collection(self, collection_name: str) -> TestcaseCollection:
 		collection_id = self._get_collection_id(collection_name)
 		row = self._cursor.execute("SELECT name, reference_runtime_secs FROM testcollection WHERE collection_id = ?;", (collection_id, )).fetchone()
-		tc_ids = set(row["tc_id"] for row in self._cursor.execute("SELECT tc_id FROM testcollection_testcases WHERE collection_id = ?;", (collection_id, )).fetchall())
-		testcases = [ self._get_testcase(tc_id) for tc_id in tc_ids ]
+		testcases = list(self._iter_testcases("JOIN testcollection_testcases USING (tc_id) WHERE collection_id = ?", (collection_id, )))
 		return TestcaseCollection(name = row["name"], testcases = testcases, reference_runtime_secs = row["reference_runtime_secs"])
 
 	def create_collection(self, collection_name: str):
+		self._collection_id_cache.pop(collection_name, None)
 		self._increase_uncommitted_write_count()
-		return self._cursor.execute("INSERT INTO testcollection (collection_id, name) VALUES ((SELECT COALESCE(MAX(collection_id) + 1, 1) FROM testcollection), ?);", (collection_name, )).lastrowid
+		return self._cursor.execute("INSERT INTO testcollection (collection_id, name) VALUES ((SELECT COALESCE(MAX(collection_id) + 1, 1) FROM testcollection), ?) RETURNING collection_id;", (collection_name, )).fetchone()[0]
 
 	def get_all_testcases(self) -> iter:
-		tags = ((row["tc_id"], row["name"]) for row in self._cursor.execute("""\
+		contained_collections = collections.defaultdict(set)
+		for (tc_id, collection_name) in self._cursor.execute("""\
 				SELECT tc_id, name FROM testcollection_testcases
 					JOIN testcollection ON testcollection.collection_id = testcollection_testcases.collection_id;
-					""").fetchall())
-
-		contained_collections = collections.defaultdict(set)
-		for (tc_id, collection_name) in tags:
+					"""):
 			contained_collections[tc_id].add(collection_name)
 
-		for row in self._cursor.execute("SELECT tc_id FROM testcases;").fetchall():
-			testcase = self._get_testcase(row["tc_id"], contained_collections = contained_collections[row["tc_id"]])
-			yield testcase
+		yield from self._iter_testcases(contained_collections = contained_collections)
 
 	def get_latest_multirun_id(self, submission_name: str) -> int | None:
 		row = self._cursor.execute("SELECT multirun_id FROM multirun WHERE source = ? ORDER BY multirun_id DESC LIMIT 1;", (submission_name, )).fetchone()
@@ -365,25 +476,23 @@ class Database(SqliteORM):
 		return row["multirun_id"]
 
 	def get_latest_run_ids(self, max_list_length: int = 10) -> list[int]:
-		return [ row["run_id"] for row in self._cursor.execute("SELECT run_id FROM testrun ORDER BY run_start_utcts DESC LIMIT ?;", (max_list_length, )).fetchall() ]
+		return [ run_id for (run_id, ) in self._cursor.execute("SELECT run_id FROM testrun ORDER BY run_start_utcts DESC LIMIT ?;", (max_list_length, )) ]
 
 	def get_latest_multirun_ids(self, max_list_length: int = 10) -> list[int]:
-		return [ row["multirun_id"] for row in self._cursor.execute("SELECT multirun_id FROM multirun ORDER BY build_start_utcts DESC LIMIT ?;", (max_list_length, )).fetchall() ]
+		return [ multirun_id for (multirun_id, ) in self._cursor.execute("SELECT multirun_id FROM multirun ORDER BY build_start_utcts DESC LIMIT ?;", (max_list_length, )) ]
+
+	@staticmethod
+	def _id_chunks(ids: list[int], chunk_size: int = 999):
+		# Split lists of IDs for "IN (...)" queries so that each query stays
+		# below the host parameter limit of older SQLite versions
+		for offset in range(0, len(ids), chunk_size):
+			yield ids[offset : offset + chunk_size]
 
 	def get_multirun_overview(self, multirun_id: int, full_overview: bool = False):
-		row = self._mapped_execute(f"""
-			SELECT {'multirun.*' if full_overview else 'multirun_id, source, source_metadata, environment_metadata, build_start_utcts, build_end_utcts, build_runtime_secs, build_runtime_allowance_secs, build_status, build_error_details'} FROM multirun
-				WHERE multirun_id = ?;
-		""", multirun_id)._mapped_fetchone("multirun")
-		return row
+		return self._mapped_execute(self._SQL_MULTIRUN_OVERVIEW[full_overview], multirun_id)._mapped_fetchone("multirun")
 
 	def get_run_overview(self, run_id: int, full_overview: bool = False):
-		row = self._mapped_execute(f"""
-			SELECT {'testrun.*' if full_overview else 'run_id, multirun_id, collection, run_start_utcts, run_end_utcts, runtime_secs, runtime_secs_container, testcase_count, runtime_allowance_secs, max_permissible_ram_mib, status, error_details'}, testcollection.reference_runtime_secs FROM testrun
-				LEFT JOIN testcollection ON testcollection.name = testrun.collection
-				WHERE run_id = ?;
-		""", run_id)._mapped_fetchone("testrun")
-		return row
+		return self._mapped_execute(self._SQL_RUN_OVERVIEW[full_overview], run_id)._mapped_fetchone("testrun")
 
 	def get_run_overviews_of_multirun(self, multirun_id: int):
 		return self._mapped_execute("""
@@ -393,42 +502,83 @@ class Database(SqliteORM):
 				ORDER BY run_id ASC;
 		""", multirun_id)._mapped_fetchall("testrun")
 
+	def get_multirun_overviews(self, multirun_ids: list[int]) -> dict[int, dict]:
+		result = { }
+		for chunk in self._id_chunks(multirun_ids):
+			for overview in self._mapped_execute(f"SELECT multirun_id, source, source_metadata, environment_metadata, build_start_utcts, build_end_utcts, build_runtime_secs, build_runtime_allowance_secs, build_status, build_error_details FROM multirun WHERE multirun_id IN ({','.join([ '?' ] * len(chunk))});", *chunk)._mapped_fetchall("multirun"):
+				result[overview["multirun_id"]] = overview
+		return result
+
+	def get_run_overviews_of_multiruns(self, multirun_ids: list[int]) -> dict[int, list[dict]]:
+		result = { multirun_id: [ ] for multirun_id in multirun_ids }
+		for chunk in self._id_chunks(list(result)):
+			for overview in self._mapped_execute(f"""
+				SELECT run_id, multirun_id, collection, run_start_utcts, run_end_utcts, runtime_secs, runtime_secs_container, testcase_count, runtime_allowance_secs, max_permissible_ram_mib, status, error_details, testcollection.reference_runtime_secs FROM testrun
+					LEFT JOIN testcollection ON testcollection.name = testrun.collection
+					WHERE multirun_id IN ({','.join([ '?' ] * len(chunk))})
+					ORDER BY run_id ASC;
+			""", *chunk)._mapped_fetchall("testrun"):
+				result[overview["multirun_id"]].append(overview)
+		return result
+
 	def get_run_result_count(self, run_id: int):
-		return [ (TestresultStatus(row["status"]), row["count"]) for row in self._cursor.execute("""
+		return [ (self._TESTRESULT_STATUS_BY_VALUE[row["status"]], row["count"]) for row in self._cursor.execute("""
 			SELECT status, count FROM testsummary
 			WHERE run_id = ?
 			ORDER BY count DESC;
 		""", (run_id, )).fetchall() ]
 
+	def get_run_result_counts(self, run_ids: list[int]) -> dict[int, list]:
+		result = { run_id: [ ] for run_id in run_ids }
+		for chunk in self._id_chunks(list(result)):
+			for row in self._cursor.execute(f"""
+				SELECT run_id, status, count FROM testsummary
+				WHERE run_id IN ({','.join([ '?' ] * len(chunk))})
+				ORDER BY run_id ASC, count DESC;
+			""", chunk):
+				result[row["run_id"]].append((self._TESTRESULT_STATUS_BY_VALUE[row["status"]], row["count"]))
+		return result
+
 	def get_run_failures(self, run_id: int, only_indeterminate: bool = False):
-		return self._mapped_execute(f"""
-			SELECT testcases.tc_id, status, testcases.action, testcases.arguments, correct_reply, received_reply FROM testfailure
-				JOIN testcases ON testcases.tc_id = testfailure.tc_id
-				WHERE (run_id = ?){" AND (status = 'indeterminate')" if only_indeterminate else ""};
-			""", run_id)._mapped_fetchall("testfailure", "testcases")
+		return self._mapped_execute(self._SQL_RUN_FAILURES[only_indeterminate], run_id)._mapped_fetchall("testfailure", "testcases")
 
 	def set_reference_runtime(self, collection_name: str, runtime_secs: float):
 		self._cursor.execute("UPDATE testcollection SET reference_runtime_secs = ? WHERE name = ?;", (runtime_secs, collection_name))
 		self._increase_uncommitted_write_count()
 
-	def set_reference_answer(self, tc_id: int, correct_reply: dict):
-		self._mapped_execute("UPDATE testcases SET correct_reply = ? WHERE tc_id = ?;",
-					(correct_reply, "testcases:correct_reply"),
-					tc_id)
-		self._increase_uncommitted_write_count()
+	def set_reference_answers(self, correct_replies: list[tuple[int, dict]]):
+		self._cursor.executemany("UPDATE testcases SET correct_reply = ? WHERE tc_id = ?;", (
+			(self._map_py_to_db_value(correct_reply, "testcases:correct_reply"), tc_id)
+			for (tc_id, correct_reply) in correct_replies))
+		self._table_written("testcases")
+		self._increase_uncommitted_write_count(len(correct_replies))
 
 	def get_most_recent_multirun_by_source(self, filter_source: str | None = None, filter_submitter_name: str | None = None, limit: int | None = None) -> dict:
+		# Only the shape of the query depends on which filters are present, the
+		# values are always bound so that the prepared statement can be reused
+		params = [ ]
+		if filter_source is not None:
+			params.append(filter_source)
+		if filter_submitter_name is not None:
+			params.append(f"%{filter_submitter_name}%")
+		if limit is not None:
+			params.append(limit)
+		# Newest multirun per source; the NOT EXISTS is answered by a seek on the
+		# (source, build_start_utcts) index
 		return self._mapped_execute(f"""
-				SELECT * FROM most_recent_multirun_by_source
-					WHERE (1 = 1)
-					{"" if filter_source is None else f"AND (source = '{filter_source}')"}
-					{"" if filter_submitter_name is None else f"AND (json_extract(source_metadata, '$.meta.json.kartfire.name') LIKE '%{filter_submitter_name}%')"}
+				SELECT multirun_id, source, source_metadata FROM multirun AS latest
+					WHERE NOT EXISTS (
+						SELECT 1 FROM multirun AS newer
+							WHERE (newer.source = latest.source) AND ((newer.build_start_utcts > latest.build_start_utcts) OR ((newer.build_start_utcts = latest.build_start_utcts) AND (newer.multirun_id > latest.multirun_id)))
+					)
+					{"" if filter_source is None else "AND (source = ?)"}
+					{"" if filter_submitter_name is None else "AND (submitter_name LIKE ?)"}
 					ORDER BY source ASC
-					{"" if limit is None else f"LIMIT {limit}"}
-		;""")._mapped_fetchall("multirun")
+					{"" if limit is None else "LIMIT ?"}
+		;""", *params)._mapped_fetchall("multirun")
 
 	def get_time_spent_in_pipeline(self) -> dict:
-		return { row["source"]: row["pipeline_time_secs"] for row in self._cursor.execute("SELECT * FROM time_spent_in_pipeline;").fetchall() }
+		return { source: pipeline_time_secs for (source, pipeline_time_secs) in self._cursor.execute("SELECT source, pipeline_time_secs FROM time_spent_in_pipeline;") }
 
 	def leaderboard_alias_add(self, source_name: str, alias_name: str):
 		try:
@@ -441,11 +591,9 @@ class Database(SqliteORM):
 
 	def get_leaderboard(self, collection_name: str):
 		return self._mapped_execute("""
-					SELECT MIN(run_id) AS run_id, subqry.source, source_metadata, alias, min_runtime_secs FROM
-							(SELECT run_id, source, source_metadata, collection, runtime_secs, MIN(runtime_secs) OVER (PARTITION BY source, collection) AS min_runtime_secs FROM successful_runs_runtimes) AS subqry
-							LEFT JOIN leaderboard_aliases ON subqry.source = leaderboard_aliases.source
-							WHERE (runtime_secs = min_runtime_secs) AND (collection = ?)
-							GROUP BY subqry.source, collection, min_runtime_secs
+					SELECT (SELECT MIN(run_id) FROM successful_runs_runtimes AS fastest WHERE (fastest.source = best.source) AND (fastest.collection = ?) AND (fastest.runtime_secs = best.min_runtime_secs)) AS run_id, best.source, source_metadata, alias, min_runtime_secs FROM
+							(SELECT source, source_metadata, MIN(runtime_secs) AS min_runtime_secs FROM successful_runs_runtimes WHERE collection = ? GROUP BY source) AS best
+							LEFT JOIN leaderboard_aliases ON best.source = leaderboard_aliases.source
 							ORDER BY min_runtime_secs ASC
 					;
-			""", collection_name)._mapped_fetchall("multirun")
+			""", collection_name, collection_name)._mapped_fetchall("multirun")
@@ -20,7 +20,6 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 import os
-import time
 import tempfile
 import json
 import asyncio
@@ -111,21 +110,18 @@ class RunningDockerContainer():
 			self._docker.add_cleanup_task(self._docker.remove_image(committed_image_id), priority = 5)
 		return committed_image_id
 
-	async def wait_timeout(self, timeout: float | None, check_interval: float = 1.0):
+	async def wait_timeout(self, timeout: float | None):
 		if timeout is None:
 			# Infinity
 			return await self.wait()
 
-		end_time = time.monotonic() + timeout
-		while True:
-			inspection_result = await self.inspect()
-			if inspection_result["State"]["Status"] != "running":
-				return await self.wait()
-			now = time.monotonic()
-			if now >= end_time:
-				return None
-			remaining_time = end_time - now
-			await asyncio.sleep(min(check_interval, remaining_time))
+		# "docker wait" blocks until the container exits, so there is no need
+		# to poll its state; on timeout the caller is responsible for stopping
+		# the container
+		try:
+			return await asyncio.wait_for(self.wait(), timeout = timeout)
+		except asyncio.TimeoutError:
+			return None
 
 	def __repr__(self):
 		return f"Container<ID {self.container_id[:8]}>"
@@ -19,15 +19,34 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+import types
+import functools
 import collections
 from .ResultBar import ResultBar
 
 class Leaderboard():
+	_KNOWN_FILETYPES = types.MappingProxyType({
+		".java":	"Java",
+		".c":		"C",
+		".h":		"C",
+		".cpp":		"C++",
+		".c++":		"C++",
+		".hpp":		"C++",
+		".h++":		"C++",
+		".py":		"Python",
+		".go":		"Go",
+		".rs":		"Rust",
+		".s":		"Assembly",
+		".S":		"Assembly",
+	})
+
 	def __init__(self, db: "Database", collection_name: str):
 		self._db = db
 		self._collection_name = collection_name
 		self._collection = self._db.get_testcase_collection(collection_name)
 		self._leaderboard = self._db.get_leaderboard(collection_name)
+		reference_runtime_secs = self._collection.reference_runtime_secs
+		inv_reference_runtime_secs = (1 / reference_runtime_secs) if reference_runtime_secs else None
 		for entry in self._leaderboard:
 			if "code_summary" in entry["source_metadata"]["meta"]:
 				filetypes = entry["source_metadata"]["meta"]["code_summary"]["info"]
@@ -37,13 +56,15 @@ class Leaderboard():
 				filetypes = entry["source_metadata"]["meta"]["filetypes"]
 				entry["code_labels"] = [ ]
 			(entry["loc"], entry["language_breakdown"], entry["language_breakdown_text"]) = self._pgm_language_breakdown(filetypes)
-			entry["reltime"] = entry["min_runtime_secs"] / self._collection.reference_runtime_secs
+			entry["reltime"] = None if (inv_reference_runtime_secs is None) else (entry["min_runtime_secs"] * inv_reference_runtime_secs)
 
 	@property
 	def collection(self):
 		return self._collection
 
-	def _pgm_language_bar(self):
+	@classmethod
+	@functools.cache
+	def _pgm_language_bar(cls):
 		rb = ResultBar(1)
 		rb.add(ResultBar.Element(element_type = ".java", character = "☕"))
 		rb.add(ResultBar.Element(element_type = ".c", character = "🅒"))
@@ -58,27 +79,14 @@ class Leaderboard():
 		return rb
 
 	def _pgm_language_breakdown(self, filetypes: dict):
-		known_filetypes = {
-			".java":	"Java",
-			".c":		"C",
-			".h":		"C",
-			".cpp":		"C++",
-			".c++":		"C++",
-			".hpp":		"C++",
-			".h++":		"C++",
-			".py":		"Python",
-			".go":		"Go",
-			".rs":		"Rust",
-			".s":		"Assembly",
-			".S":		"Assembly",
-		}
 		counter = collections.Counter()
 		for (filetype, linecount) in filetypes.items():
-			if filetype in known_filetypes:
-				counter[known_filetypes[filetype]] += linecount
-		total_lines = sum(counter.values())
+			language = self._KNOWN_FILETYPES.get(filetype)
+			if language is not None:
+				counter[language] += linecount
+		total_lines = counter.total()
 		if total_lines == 0:
-			return (total_lines, "-")
+			return (total_lines, counter, "-")
 
 		breakdown = ", ".join(f"{linecount / total_lines * 100:.0f}% {language}" for (language, linecount) in counter.most_common(3))
 		return (total_lines, counter, breakdown)
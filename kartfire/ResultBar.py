@@ -23,6 +23,8 @@ import collections
 import dataclasses
 
 class ResultBar():
+	_UNKNOWN = object()
+
 	@dataclasses.dataclass
 	class Element():
 		element_type: str
@@ -36,6 +38,9 @@ class ResultBar():
 		self._length = length
 		self._sort_by_most_common = sort_by_most_common
 		self._elements = collections.OrderedDict()
+		self._alias_map = { }
+		self._call_cache = collections.OrderedDict()
+		self._max_call_cache_size = 1024
 
 	@property
 	def count_other(self):
@@ -45,6 +50,8 @@ class ResultBar():
 		if element.element_type in self._elements:
 			raise ValueError(f"Duplicate element type: {element}")
 		self._elements[element.element_type] = element
+		self._alias_map[element.element_type] = element.element_type if (element.alias is None) else element.alias
+		self._call_cache.clear()
 		return self
 
 	def set_other(self, element: "Element | None"):
@@ -53,14 +60,15 @@ class ResultBar():
 
 	def _select_relevant_items(self, distribution_dict: dict):
 		relevant_items = { }
-		other_count = 0
+		resolve = self._alias_map.get
+		count_other = self.count_other
 		for (key, count) in distribution_dict.items():
-			if key in self._elements:
-				if self._elements[key].alias is not None:
-					key = self._elements[key].alias
-				relevant_items[key] = relevant_items.get(key, 0) + count
-			elif self.count_other:
-				relevant_items[None] = relevant_items.get(None, 0) + count
+			key = resolve(key, self._UNKNOWN)
+			if key is self._UNKNOWN:
+				if not count_other:
+					continue
+				key = None
+			relevant_items[key] = relevant_items.get(key, 0) + count
 		return relevant_items
 
 	def _sort_relevant_items(self, relevant_items: dict) -> dict:
@@ -73,30 +81,52 @@ class ResultBar():
 			result[key] = relevant_items[key]
 		return result
 
-	def _scale_items(self, relevant_items: dict, scalar: float) -> dict:
+	def _apportion_items(self, relevant_items: dict) -> dict:
+		# Largest remainder method: every item gets the integer part of its
+		# share, the characters left over go to the largest fractional parts.
+		# Items that must be shown but whose share is below one character are
+		# pinned to a single character beforehand.
+		total_count = sum(relevant_items.values())
+		pinned = set(key for (key, count) in relevant_items.items() if self._elements[key].force_nonzero_show and (self._length * count < total_count))
+		apportioned_length = self._length - len(pinned)
+		apportioned_count = total_count - sum(relevant_items[key] for key in pinned)
+
 		scaled_counts = collections.OrderedDict()
+		remainders = [ ]
 		for (key, count) in relevant_items.items():
-			scaled_count = round(scalar * count)
-			if self._elements[key].force_nonzero_show:
-				scaled_count = max(1, scaled_count)
-			scaled_counts[key] = scaled_count
+			if key in pinned:
+				scaled_counts[key] = 1
+			else:
+				share = apportioned_length * count / apportioned_count
+				scaled_counts[key] = int(share)
+				remainders.append((share - int(share), key))
+
+		leftover = self._length - sum(scaled_counts.values())
+		for (remainder, key) in sorted(remainders, key = lambda item: -item[0])[:leftover]:
+			scaled_counts[key] += 1
 		return scaled_counts
 
 	def __call__(self, distribution_dict: dict):
+		if len(distribution_dict) > 32:
+			return self._render(distribution_dict)
+
+		# Key keeps insertion order: ties between equal counts are resolved by
+		# it when sorting by most common
+		key = tuple(distribution_dict.items())
+		if key in self._call_cache:
+			self._call_cache.move_to_end(key)
+			return self._call_cache[key]
+		result = self._render(distribution_dict)
+		self._call_cache[key] = result
+		if len(self._call_cache) > self._max_call_cache_size:
+			self._call_cache.popitem(last = False)
+		return result
+
+	def _render(self, distribution_dict: dict):
 		relevant_items = self._select_relevant_items(distribution_dict)
 		relevant_items = self._sort_relevant_items(relevant_items)
 
-		total_count = sum(relevant_items.values())
-		offset = 0
-
-		while True:
-			scaled_counts = self._scale_items(relevant_items, (self._length - offset) / total_count)
-			char_count = sum(scaled_counts.values())
-			if char_count > self._length:
-				offset += (char_count - self._length) / 2
-			else:
-				break
-		assert(char_count == self._length)
+		scaled_counts = self._apportion_items(relevant_items)
 
 		result_bar_items = [ ]
 		for (key, count) in scaled_counts.items():
@@ -108,34 +138,6 @@ class ResultBar():
 				result_bar_items.append(element.suffix)
 		return "".join(result_bar_items)
 
-	def call__(self, run_result: "RunResult"):
-		if not run_result.have_results:
-			# No tests run?
-			return "[" + (" " * self._length) + "]"
-
-		result = { }
-		total_chars_used = 0
-		for (value, symbol, color) in self._display:
-			match_count = run_result.result_count_dict.get(value, 0)
-			if match_count > 0:
-				char_count = max(1, round(match_count / run_result.total_testcase_count * self._length))
-				total_chars_used += char_count
-				result[value] = char_count
-
-		while total_chars_used > self._length:
-			maxc = max(result.values())
-			for (value, count) in result.items():
-				if count == maxc:
-					result[value] -= 1
-					total_chars_used -= 1
-
-		result_string = [ "[" ]
-		for (value, symbol, color) in self._display:
-			if value in result:
-				result_string.append(f"{color}{symbol * result[value]}{self._clear_color}")
-		result_string += [ "]" ]
-		return "".join(result_string)
-
 if __name__ == "__main__":
 	rb = ResultBar(30, sort_by_most_common = True)
 	rb.add(ResultBar.Element(element_type = "pass", character = "+"))
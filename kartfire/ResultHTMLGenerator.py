@@ -20,20 +20,30 @@
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
 import os
-import tzlocal
 import mako.lookup
 from .RunResult import MultiRunResult
 from .Enums import TestrunStatus, TestresultStatus
+from .Tools import SystemTools
 
 class ResultHTMLGenerator():
+	_TEMPLATE_DIR = os.path.dirname(__file__) + "/templates"
+
+	# Shared by all instances so that every template is compiled only once per
+	# process; compiled modules are only kept on disk across processes when
+	# KARTFIRE_MAKO_CACHE names a directory for them
+	_LOOKUP = mako.lookup.TemplateLookup([ _TEMPLATE_DIR ], strict_undefined = True, module_directory = os.environ.get("KARTFIRE_MAKO_CACHE"))
+
 	def __init__(self, db: "Database"):
 		self._db = db
-		self._output_tz = tzlocal.get_localzone()
-		template_dir = os.path.dirname(__file__) + "/templates"
-		self._lookup = mako.lookup.TemplateLookup([ template_dir ], strict_undefined = True)
+		self._output_tz = SystemTools.get_local_timezone()
+
+	@classmethod
+	def preload(cls):
+		for template_name in os.listdir(cls._TEMPLATE_DIR):
+			cls._LOOKUP.get_template(template_name)
 
 	def create(self, multirun: "MultiRunResult", template_name: str):
-		template = self._lookup.get_template(template_name)
+		template = self._LOOKUP.get_template(template_name)
 		template_vars = {
 			"m": multirun,
 			"TestresultStatus": TestresultStatus,
@@ -19,46 +19,38 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+import io
+import sys
 import enum
 import json
-import collections
+import operator
+import functools
+import contextlib
 import datetime
-import tzlocal
 from .Enums import TestrunStatus, TestresultStatus
-from .RunResult import MultiRunResult
+from .RunResult import RunResult, MultiRunResult
 from .TableFormatter import Table, CellFormatter
+from .Tools import SystemTools
 
 class ResultColorizer():
-	def __init__(self, ansi: bool = True):
+	def __init__(self, ansi: bool | None = None):
+		if ansi is None:
+			# Only color output that goes to a terminal
+			ansi = sys.stdout.isatty()
 		self._ansi = ansi
-
-	@property
-	def clr(self):
-		return "\x1b[0m" if self._ansi else ""
-
-	@property
-	def red(self):
-		return "\x1b[31m" if self._ansi else ""
-
-	@property
-	def green(self):
-		return "\x1b[32m" if self._ansi else ""
-
-	@property
-	def yellow(self):
-		return "\x1b[33m" if self._ansi else ""
-
-	@property
-	def blue(self):
-		return "\x1b[34m" if self._ansi else ""
-
-	@property
-	def purple(self):
-		return "\x1b[35m" if self._ansi else ""
-
-	@property
-	def cyan(self):
-		return "\x1b[36m" if self._ansi else ""
+		# Plain attributes, these are read for every colored fragment printed
+		self.clr = "\x1b[0m" if ansi else ""
+		self.red = "\x1b[31m" if ansi else ""
+		self.green = "\x1b[32m" if ansi else ""
+		self.yellow = "\x1b[33m" if ansi else ""
+		self.blue = "\x1b[34m" if ansi else ""
+		self.purple = "\x1b[35m" if ansi else ""
+		self.cyan = "\x1b[36m" if ansi else ""
+
+	def cell_color(self, color: CellFormatter.Color) -> CellFormatter.Color:
+		# Table cells are colored by the TableFormatter, which has no notion of
+		# where its output goes
+		return color if self._ansi else CellFormatter.Color.Default
 
 	def ratio(self, ratio: float):
 		if ratio < 0:
@@ -74,7 +66,8 @@ class ResultColorizer():
 
 class ResultBar():
 	def __init__(self, display: tuple, clear_color: str, length: int = 30):
-		self._display = display
+		self._order = tuple(value for (value, symbol, color) in display)
+		self._symbol_color = { value: (symbol, color) for (value, symbol, color) in display }
 		self._clear_color = clear_color
 		self._length = length
 
@@ -83,26 +76,45 @@ class ResultBar():
 			# No tests run?
 			return "[" + (" " * self._length) + "]"
 
+		# Only shown values end up in the result, in display order
 		result = { }
 		total_chars_used = 0
-		for (value, symbol, color) in self._display:
-			match_count = run_result.result_count_dict.get(value, 0)
+		result_count_dict = run_result.result_count_dict
+		total_testcase_count = run_result.total_testcase_count
+		for value in self._order:
+			match_count = result_count_dict.get(value, 0)
 			if match_count > 0:
-				char_count = max(1, round(match_count / run_result.total_testcase_count * self._length))
+				char_count = max(1, round(match_count / total_testcase_count * self._length))
 				total_chars_used += char_count
 				result[value] = char_count
 
-		while total_chars_used > self._length:
-			maxc = max(result.values())
+		if total_chars_used > self._length:
+			# Shaving one character off all longest segments until the bar fits
+			# amounts to capping every segment at the highest level that fits,
+			# which can be found in a single pass over the descending counts
+			counts = sorted(result.values(), reverse = True)
+			remaining_sum = total_chars_used
+			for (index, count) in enumerate(counts):
+				remaining_sum -= count
+				level = (self._length - remaining_sum) // (index + 1)
+				next_count = counts[index + 1] if (index + 1 < len(counts)) else 0
+				if level >= next_count:
+					break
 			for (value, count) in result.items():
-				if count == maxc:
-					result[value] -= 1
-					total_chars_used -= 1
+				result[value] = min(count, level)
 
+		# Only switch colors between segments and reset once at the end, a
+		# reset immediately followed by a new color is redundant
 		result_string = [ "[" ]
-		for (value, symbol, color) in self._display:
-			if value in result:
-				result_string.append(f"{color}{symbol * result[value]}{self._clear_color}")
+		current_color = None
+		for (value, char_count) in result.items():
+			(symbol, color) = self._symbol_color[value]
+			if color != current_color:
+				result_string.append(color)
+				current_color = color
+			result_string.append(symbol * char_count)
+		if current_color is not None:
+			result_string.append(self._clear_color)
 		result_string += [ "]" ]
 		return "".join(result_string)
 
@@ -120,12 +132,26 @@ class ResultPrinter():
 		PassCount = enum.auto()
 		FailCount = enum.auto()
 
+	# Every result but a pass can be recorded as a failure
+	_FAILURE_STATUS_COUNT = len(TestresultStatus) - 1
+
 	def __init__(self, db: "Database", sort_order: SortOrder = SortOrder.Source):
 		self._db = db
 		self._sort_order = sort_order
-		self._output_tz = tzlocal.get_localzone()
+		self._output_tz = SystemTools.get_local_timezone()
+		# The table formats every timestamp cell twice (once to determine the
+		# column width, once to render it), so keep the formatted strings
+		self._fmtts = functools.lru_cache(maxsize = 4096)(self._fmtts)
 		self._color = ResultColorizer()
+		self._result_bar = ResultBar((
+			(TestresultStatus.Pass, "+", self._color.green),
+			(TestresultStatus.Fail, "-", self._color.red),
+			(TestresultStatus.NoAnswer, "_", self._color.red),
+			(TestresultStatus.Indeterminate, "?", self._color.yellow),
+		), self._color.clr)
 		self._max_failed_cases_per_action = 2
+		self._testcase_json_cache = { }
+		self._max_testcase_json_cache_size = 4096
 
 	@classmethod
 	def overview_type_by_detail_level(cls, detail_level: int) -> OverviewType:
@@ -134,6 +160,17 @@ class ResultPrinter():
 			case 1: return cls.OverviewType.RunOverview
 			case _: return cls.OverviewType.DetailOverview
 
+	@contextlib.contextmanager
+	def _buffered_output(self):
+		# Collect everything printed in one block and hand it to stdout with a
+		# single write instead of one write per line
+		buffer = io.StringIO()
+		try:
+			with contextlib.redirect_stdout(buffer):
+				yield
+		finally:
+			sys.stdout.write(buffer.getvalue())
+
 	def _fmtts(self, utc_ts: datetime.datetime, format_str: str = "full"):
 		local_ts = utc_ts.astimezone(self._output_tz)
 		match format_str:
@@ -147,46 +184,56 @@ class ResultPrinter():
 				raise ValueError(format_str)
 
 	def print_run_overview(self, run_result: "RunResult"):
-		result_bar = ResultBar((
-			(TestresultStatus.Pass, "+", self._color.green),
-			(TestresultStatus.Fail, "-", self._color.red),
-			(TestresultStatus.NoAnswer, "_", self._color.red),
-			(TestresultStatus.Indeterminate, "?", self._color.yellow),
-		), self._color.clr)
-
 		columns = [ ]
 		columns.append(f"{run_result.full_id:<9s}")
 		columns.append(f"{run_result.multirun.source:<30s}")
 		columns.append(f"{run_result.overview['collection']:<25s}")
 		ts = f"[ref {run_result.reference_runtime:d} lim {run_result.runtime_allowance:d} act {run_result.runtime:d}]"
 		columns.append(f"{ts:<38s}")
-		columns.append(f"{result_bar(run_result)}")
+		columns.append(f"{self._result_bar(run_result)}")
 		columns.append(f"{run_result.status_text}")
 		columns.append(f"{run_result.runtime:d}")
 		columns.append(f"{run_result.error_text}")
 		print(" ".join(columns))
 
-	def _print_answer(self, testcase_result: dict):
-		def print_dict(dict_data: dict, prefix = "\t", color = ""):
-			print(color, end = "")
-			for line in json.dumps(dict_data, indent = "\t", sort_keys = True).split("\n"):
-				print(f"{prefix}{line}")
-			print(self._color.clr, end = "")
+	@staticmethod
+	def _format_json(data: dict, prefix: str = "\t"):
+		# Prefix every line by substitution rather than splitting into lines
+		return prefix + json.dumps(data, indent = "\t", sort_keys = True).replace("\n", "\n" + prefix) + "\n"
+
+	def _format_testcase_json(self, tc_id: int, field_name: str, data: dict):
+		# The same testcases fail across many submissions; indented dumping is
+		# done in pure Python, so reuse the text as long as the data is unchanged
+		key = (tc_id, field_name)
+		cached = self._testcase_json_cache.get(key)
+		if (cached is not None) and (cached[0] == data):
+			return cached[1]
+		if len(self._testcase_json_cache) >= self._max_testcase_json_cache_size:
+			self._testcase_json_cache.clear()
+		text = self._format_json(data)
+		self._testcase_json_cache[key] = (data, text)
+		return text
 
+	def _print_answer(self, testcase_result: dict):
 		status = testcase_result["status"]
+		tc_id = testcase_result["tc_id"]
 		arguments = testcase_result["arguments"]
 		correct_reply = testcase_result["correct_reply"]
 		received_reply_json = testcase_result["received_reply"]
 
-		print_dict(arguments, color = self._color.cyan)
-		print()
-		print("    Expected correct reply:")
-		print_dict(correct_reply, color = self._color.green)
-		print()
+		# Assemble the whole record and hand it over in one write
+		clr = self._color.clr
+		parts = [
+			self._color.cyan, self._format_testcase_json(tc_id, "arguments", arguments), clr, "\n",
+			"    Expected correct reply:\n",
+			self._color.green, self._format_testcase_json(tc_id, "correct_reply", correct_reply), clr, "\n",
+		]
 		if status != TestresultStatus.NoAnswer:
-			print("    Received reply:")
-			print_dict(received_reply_json, color = self._color.red)
-			print()
+			parts += [
+				"    Received reply:\n",
+				self._color.red, self._format_json(received_reply_json), clr, "\n",
+			]
+		sys.stdout.write("".join(parts))
 
 	def _print_multiline_text(self, heading: str, text: str):
 		table = Table()
@@ -197,36 +244,55 @@ class ResultPrinter():
 		table.print("line")
 
 	def _print_failure_details(self, multirun_result: "MultiRunResult"):
+		multirun_overview = multirun_result.overview
 		if multirun_result.build_failed:
 			# Build failed.
-			print(f"Showing build output of {multirun_result.source} of {multirun_result.solution_author or 'unknown author'}. {self._color.red}Build status {multirun_result.overview['build_status'].name}{self._color.clr} after {multirun_result.build_runtime:r} secs:")
+			print(f"Showing build output of {multirun_result.source} of {multirun_result.solution_author or 'unknown author'}. {self._color.red}Build status {multirun_overview['build_status'].name}{self._color.clr} after {multirun_result.build_runtime:r} secs:")
 			self._print_multiline_text("build stderr", multirun_result.build_stderr_text)
-			if multirun_result.overview["build_error_details"] is not None:
-				print(multirun_result.overview["build_error_details"]["text"])
+			build_error_details = multirun_overview["build_error_details"]
+			if build_error_details is not None:
+				print(build_error_details["text"])
 		else:
-			print(f"Showing testrun summary of {multirun_result.source} of {multirun_result.solution_author or 'unknown author'}. {self._color.green}Build status {multirun_result.overview['build_status'].name}{self._color.clr} after {multirun_result.build_runtime:r} secs:")
+			print(f"Showing testrun summary of {multirun_result.source} of {multirun_result.solution_author or 'unknown author'}. {self._color.green}Build status {multirun_overview['build_status'].name}{self._color.clr} after {multirun_result.build_runtime:r} secs:")
 
 			for run_result in multirun_result:
 				if run_result.all_pass:
 					continue
+				overview = run_result.overview
+				run_status = overview["status"]
 				tr = f"Testrun {multirun_result.multirun_id}.{run_result.run_id}"
 				tm = f"{run_result.runtime:r}/{run_result.runtime_allowance:r}"
-				print(f"{tr:<17s} {self._color.green if run_result.run_completed else self._color.red}{run_result.collection_name:<25s} {run_result.overview['status'].name:<10s} {tm:<18s}{self._color.clr} {self._color.green if run_result.all_pass else self._color.red}{run_result.status_text}{self._color.clr}")
-
-				if run_result.overview["status"] != TestrunStatus.Finished:
-					if run_result.overview["error_details"] is not None:
-						print(f"{' '.join(run_result.overview['error_details']['cmd'])}: {run_result.overview['error_details']['text']}")
-					if run_result.stderr_text != "":
-						self._print_multiline_text("run stderr", run_result.stderr_text)
-				print(f"    {len(run_result.test_failures)} failed testcases recorded, showing the first {self._max_failed_cases_per_action} of each kind:")
-				action_count = collections.Counter()
-				for failure in run_result.test_failures:
-					action_count[failure["status"]] += 1
-					if action_count[failure["status"]] > self._max_failed_cases_per_action:
-						continue
-
-					print(f"    {'═' * 5} {self._color.red}{failure['status'].name}{self._color.clr} on TC {failure['tc_id']} action {self._color.yellow}{failure['action']}{self._color.clr} {'═' * 5}")
-					self._print_answer(failure)
+				clr = self._color.clr
+				completion_color = self._color.green if run_result.run_completed else self._color.red
+				status_color = self._color.green if run_result.all_pass else self._color.red
+				print(f"{tr:<17s} {completion_color}{run_result.collection_name:<25s} {run_status.name:<10s} {tm:<18s}{clr} {status_color}{run_result.status_text}{clr}")
+
+				if run_status != TestrunStatus.Finished:
+					error_details = overview["error_details"]
+					if error_details is not None:
+						print(f"{' '.join(error_details['cmd'])}: {error_details['text']}")
+					stderr_text = run_result.stderr_text
+					if stderr_text != "":
+						self._print_multiline_text("run stderr", stderr_text)
+				test_failures = run_result.test_failures
+				print(f"    {len(test_failures)} failed testcases recorded, showing the first {self._max_failed_cases_per_action} of each kind:")
+				if self._max_failed_cases_per_action > 0:
+					action_count = { }
+					exhausted_statuses = set()
+					for failure in test_failures:
+						if len(exhausted_statuses) == self._FAILURE_STATUS_COUNT:
+							# Every kind of failure has been shown as often as allowed
+							break
+						failure_status = failure["status"]
+						if failure_status in exhausted_statuses:
+							continue
+						shown_count = action_count.get(failure_status, 0) + 1
+						action_count[failure_status] = shown_count
+						if shown_count == self._max_failed_cases_per_action:
+							exhausted_statuses.add(failure_status)
+
+						print(f"    {'═' * 5} {self._color.red}{failure_status.name}{self._color.clr} on TC {failure['tc_id']} action {self._color.yellow}{failure['action']}{self._color.clr} {'═' * 5}")
+						self._print_answer(failure)
 		print()
 		print("━" * 88)
 		print()
@@ -271,17 +337,20 @@ class ResultPrinter():
 		table.add_separator_row()
 		return table
 
-	def _sort_key(self, multi_run_result: "MultiRunResult"):
+	@property
+	def _sort_key(self):
+		# Resolve the sort order once per sort instead of once per comparison key
 		match self._sort_order:
-			case self.SortOrder.Source: return multi_run_result.source
-			case self.SortOrder.DateTime: return multi_run_result.build_start_utcts
-			case self.SortOrder.FailCount: return multi_run_result.nonpass_count
-			case self.SortOrder.PassCount: return multi_run_result.pass_count
-			case self.SortOrder.Author: return (multi_run_result.solution_author or "", multi_run_result.source, )
+			case self.SortOrder.Source: return operator.attrgetter("source")
+			case self.SortOrder.DateTime: return operator.attrgetter("build_start_utcts")
+			case self.SortOrder.FailCount: return operator.attrgetter("nonpass_count")
+			case self.SortOrder.PassCount: return operator.attrgetter("pass_count")
+			case self.SortOrder.Author: return lambda multi_run_result: (multi_run_result.solution_author or "", multi_run_result.source, )
 
 	def print_table(self, multirun_list: list["MultiRunResult"], overview_type: OverviewType = OverviewType.BasicOverview):
 		table = self._initialize_table()
 		collection_list = self._find_all_collections(multirun_list)
+		RunResult.prefetch_result_counts(self._db, [ run_result for multirun_result in multirun_list for run_result in multirun_result ])
 
 		multirun_list.sort(key = self._sort_key)
 		for multirun_result in multirun_list:
@@ -304,56 +373,62 @@ class ResultPrinter():
 							result_indicator.append("~")
 						else:
 							result_indicator.append("✗")
+			pass_percentage = multirun_result.pass_percentage
 			cell_formatters = { }
 			if multirun_result.all_pass:
-				cell_formatters["name"] = table["name"].override(color = CellFormatter.Color.Green)
-			elif multirun_result.pass_percentage < 50:
-				cell_formatters["name"] = table["name"].override(color = CellFormatter.Color.Red)
-			elif multirun_result.pass_percentage < 90:
-				cell_formatters["name"] = table["name"].override(color = CellFormatter.Color.Yellow)
+				cell_formatters["name"] = table["name"].override(color = self._color.cell_color(CellFormatter.Color.Green))
+			elif pass_percentage < 50:
+				cell_formatters["name"] = table["name"].override(color = self._color.cell_color(CellFormatter.Color.Red))
+			elif pass_percentage < 90:
+				cell_formatters["name"] = table["name"].override(color = self._color.cell_color(CellFormatter.Color.Yellow))
 			table.add_row({
 				"source": multirun_result.source,
 				"name": multirun_result.solution_author or "N/A",
 				"result_indicator": "".join(result_indicator),
 				"pass_count": multirun_result.pass_count,
 				"fail_count": multirun_result.nonpass_count,
-				"percentage": multirun_result.pass_percentage,
+				"percentage": pass_percentage,
 				"run_ts": multirun_result.build_start_utcts,
 			}, cell_formatters = cell_formatters)
 
 			if overview_type in [ self.OverviewType.RunOverview, self.OverviewType.DetailOverview ]:
 				# Print results for each run
 				for run_result in multirun_result:
+					run_status = run_result.overview["status"]
+					pass_percentage = run_result.pass_percentage
 					cell_formatters = { }
 					if run_result.all_pass:
-						cell_formatters["name"] = table["name"].override(color = CellFormatter.Color.Green)
-					elif run_result.pass_percentage < 50:
-						cell_formatters["name"] = table["name"].override(color = CellFormatter.Color.Red)
-					elif run_result.pass_percentage < 90:
-						cell_formatters["name"] = table["name"].override(color = CellFormatter.Color.Yellow)
+						cell_formatters["name"] = table["name"].override(color = self._color.cell_color(CellFormatter.Color.Green))
+					elif pass_percentage < 50:
+						cell_formatters["name"] = table["name"].override(color = self._color.cell_color(CellFormatter.Color.Red))
+					elif pass_percentage < 90:
+						cell_formatters["name"] = table["name"].override(color = self._color.cell_color(CellFormatter.Color.Yellow))
 
-					if run_result.overview["status"] != TestrunStatus.Finished:
-						cell_formatters["result_indicator"] = CellFormatter(color = CellFormatter.Color.Red)
+					if run_status != TestrunStatus.Finished:
+						cell_formatters["result_indicator"] = CellFormatter(color = self._color.cell_color(CellFormatter.Color.Red))
 
 					table.add_row({
 						"name": run_result.collection_name,
-						"result_indicator": run_result.overview["status"].name,
+						"result_indicator": run_status.name,
 						"pass_count": run_result.pass_count,
 						"fail_count": run_result.nonpass_count,
-						"percentage": run_result.pass_percentage,
+						"percentage": pass_percentage,
 						"time_percentage": 100 * (run_result.relative_runtime or 0),
 					}, cell_formatters = cell_formatters)
 				if overview_type == self.OverviewType.DetailOverview:
-					table.print("source", "name", "result_indicator", "pass_count", "fail_count", "percentage")
-					self._print_failure_details(multirun_result)
+					with self._buffered_output():
+						table.print("source", "name", "result_indicator", "pass_count", "fail_count", "percentage")
+						self._print_failure_details(multirun_result)
 					table = self._initialize_table()
 
 		match overview_type:
 			case self.OverviewType.BasicOverview:
-				table.print("source", "run_ts", "name", "result_indicator", "pass_count", "fail_count", "percentage")
+				with self._buffered_output():
+					table.print("source", "run_ts", "name", "result_indicator", "pass_count", "fail_count", "percentage")
 
 			case self.OverviewType.RunOverview:
-				table.print("source", "name", "result_indicator", "pass_count", "fail_count", "percentage", "time_percentage")
+				with self._buffered_output():
+					table.print("source", "name", "result_indicator", "pass_count", "fail_count", "percentage", "time_percentage")
 
 			case self.OverviewType.DetailOverview:
 				pass
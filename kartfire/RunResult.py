@@ -40,12 +40,22 @@ class RunResult():
 	def stderr(self):
 		return self._get_field("stderr")
 
+	@staticmethod
+	def _output_to_text(output: bytes):
+		# Strip the raw bytes before decoding so surrounding whitespace is never
+		# decoded; the second strip only catches whitespace that was enclosed by
+		# non-ASCII bytes dropped in decoding
+		output = output.strip(b"\r\n\t ")
+		if len(output) == 0:
+			return ""
+		return output.decode("ascii", errors = "ignore").strip("\r\n\t ")
+
 	@property
 	def stderr_text(self):
 		if self.stderr is None:
 			return "N/A"
 		else:
-			return self.stderr.decode("ascii", errors = "ignore").strip("\r\n\t ")
+			return self._output_to_text(self.stderr)
 
 	@property
 	def full_id(self):
@@ -97,6 +107,17 @@ class RunResult():
 	def full_overview(self):
 		return self._db.get_run_overview(self.run_id, full_overview = True)
 
+	@classmethod
+	def prefetch_result_counts(cls, db: "Database", run_results: list["RunResult"]):
+		# Fill the result_count cache of many runs with one query instead of
+		# issuing one query per run when each is first accessed
+		run_results = [ run_result for run_result in run_results if "result_count" not in run_result.__dict__ ]
+		if len(run_results) == 0:
+			return
+		result_counts = db.get_run_result_counts([ run_result.run_id for run_result in run_results ])
+		for run_result in run_results:
+			run_result.__dict__["result_count"] = result_counts[run_result.run_id]
+
 	@functools.cached_property
 	def result_count(self):
 		return self._db.get_run_result_count(self.run_id)
@@ -150,14 +171,14 @@ class RunResult():
 	def have_results(self):
 		return len(self.result_count) > 0
 
-	@property
+	@functools.cached_property
 	def status_text(self):
 		if len(self.result_count) == 1:
 			return f"All {self.result_count[0][0].name}"
 		else:
 			return ", ".join(f"{count}/{count / self.total_testcase_count * 100:.1f}% {status.name}" for (status, count) in self.result_count)
 
-	@property
+	@functools.cached_property
 	def error_text(self):
 		if self.overview["error_details"] is not None:
 			return self.overview["error_details"]["text"]
@@ -165,16 +186,18 @@ class RunResult():
 			return ""
 
 class MultiRunResult():
-	def __init__(self, db: "Database", multirun_id: int, preloaded_runs: list[RunResult] | None = None):
+	def __init__(self, db: "Database", multirun_id: int, preloaded_runs: list[RunResult] | None = None, preloaded_overview: dict | None = None, preloaded_run_overviews: list[dict] | None = None):
 		self._db = db
 		self._multirun_id = multirun_id
-		self._overview = db.get_multirun_overview(multirun_id)
+		self._overview = preloaded_overview if (preloaded_overview is not None) else db.get_multirun_overview(multirun_id)
 		if self._overview is None:
 			raise NoSuchMultirunException(f"Multirun {multirun_id} not found.")
 		if preloaded_runs is not None:
 			self._run_results = preloaded_runs
 		else:
-			self._run_results = [ RunResult(db, self, run_result) for run_result in self._db.get_run_overviews_of_multirun(self._multirun_id) ]
+			if preloaded_run_overviews is None:
+				preloaded_run_overviews = self._db.get_run_overviews_of_multirun(self._multirun_id)
+			self._run_results = [ RunResult(db, self, run_result) for run_result in preloaded_run_overviews ]
 		self._run_result_by_collection = { run_result.collection_name: run_result for run_result in self._run_results }
 
 	@property
@@ -209,6 +232,20 @@ class MultiRunResult():
 	def build_failed(self):
 		return self.overview["build_status"] != TestrunStatus.Finished
 
+	@classmethod
+	def load_many(cls, db: "Database", multirun_ids: list[int]) -> list["MultiRunResult"]:
+		# Load the multiruns, their runs and the runs' result counts with a
+		# handful of bulk queries instead of several queries per multirun
+		overviews = db.get_multirun_overviews(multirun_ids)
+		run_overviews = db.get_run_overviews_of_multiruns(multirun_ids)
+		multiruns = [ ]
+		for multirun_id in multirun_ids:
+			if multirun_id not in overviews:
+				raise NoSuchMultirunException(f"Multirun {multirun_id} not found.")
+			multiruns.append(cls(db, multirun_id, preloaded_overview = overviews[multirun_id], preloaded_run_overviews = run_overviews[multirun_id]))
+		RunResult.prefetch_result_counts(db, [ run_result for multirun in multiruns for run_result in multirun ])
+		return multiruns
+
 	@classmethod
 	def load_single_run(cls, db: "Database", run_id: int):
 		run_overview = db.get_run_overview(run_id)
@@ -218,25 +255,27 @@ class MultiRunResult():
 		run_result._multirun = multirun
 		return run_result
 
-	@property
+	@functools.cached_property
 	def have_git_info(self):
 		return ("meta" in self.source_meta) and ("git" in self.source_meta["meta"]) and ("commit" in self.source_meta["meta"]["git"])
 
-	@property
+	@functools.cached_property
 	def source(self):
-		if self.have_git_info:
+		# "shortcommit" is recorded exactly when a commit is, so a single lookup
+		# attempt replaces the have_git_info check
+		try:
 			return f"{self.overview['source']}:{self.source_meta['meta']['git']['shortcommit']}"
-		else:
+		except KeyError:
 			return f"{self.overview['source']}"
 
-	@property
+	@functools.cached_property
 	def solution_author(self):
 		try:
 			return self.source_meta["meta"]["json"]["kartfire"]["name"]
 		except KeyError:
 			return None
 
-	@property
+	@functools.cached_property
 	def solution_email(self):
 		try:
 			return self.source_meta["meta"]["json"]["kartfire"]["email"]
@@ -255,7 +294,7 @@ class MultiRunResult():
 		if self.full_overview["build_stderr"] is None:
 			return "N/A"
 		else:
-			return self.full_overview["build_stderr"].decode("ascii", errors = "ignore").strip("\r\n\t ")
+			return RunResult._output_to_text(self.full_overview["build_stderr"])
 
 	@property
 	def build_allowance(self):
@@ -273,17 +312,28 @@ class MultiRunResult():
 	def test_reference_runtime(self):
 		return TimeDelta(sum(run_result.overview["reference_runtime_secs"] for run_result in self))
 
+	@functools.cached_property
+	def _result_summary(self):
+		# Aggregate all runs in a single pass, the individual counts are read
+		# several times per multirun when printing
+		(pass_count, total_testcase_count, all_pass) = (0, 0, True)
+		for run_result in self:
+			pass_count += run_result.pass_count
+			total_testcase_count += run_result.total_testcase_count
+			all_pass = all_pass and run_result.all_pass
+		return (pass_count, total_testcase_count, all_pass)
+
 	@property
 	def pass_count(self):
-		return sum(testrun.pass_count for testrun in self)
+		return self._result_summary[0]
 
 	@property
 	def nonpass_count(self):
-		return sum(testrun.nonpass_count for testrun in self)
+		return self.total_testcase_count - self.pass_count
 
 	@property
 	def total_testcase_count(self):
-		return sum(testrun.total_testcase_count for testrun in self)
+		return self._result_summary[1]
 
 	@property
 	def pass_percentage(self):
@@ -291,7 +341,7 @@ class MultiRunResult():
 
 	@property
 	def all_pass(self):
-		return all(run_result.all_pass for run_result in self)
+		return self._result_summary[2]
 
 	def send_email(self, test_fixture_config: "TestFixtureConfig", html_generator: "ResultHTMLGenerator", dropoff: "mailcoil.MailDropoff"):
 		email_body = html_generator.create(multirun = self, template_name = "email.html")
@@ -21,7 +21,9 @@
 
 import time
 import json
+import zlib
 import datetime
+import contextlib
 import sqlite3
 
 class DebuggingCursor():
@@ -40,8 +42,15 @@ class DebuggingCursor():
 
 
 class SqliteORM():
+	_JSON_ENCODER = json.JSONEncoder(sort_keys = True, separators = (",", ":"))
+	_JSON_DECODER = json.JSONDecoder()
+	_COMPRESSED_BLOB_MAGIC = b"\x00kfz"
+	_INSERT_SQL_CACHE = { }
+
 	def __init__(self, filename: str):
-		self._conn = sqlite3.connect(filename)
+		# Let the module open write transactions itself, but as IMMEDIATE so the
+		# write lock is taken up front and all writes until commit() are batched
+		self._conn = sqlite3.connect(filename, isolation_level = "IMMEDIATE", cached_statements = 256)
 		self._conn.row_factory = sqlite3.Row
 #		self._cursor = DebuggingCursor(self._conn.cursor())
 		self._cursor = self._conn.cursor()
@@ -49,9 +58,44 @@ class SqliteORM():
 		self._max_uncommitted_writes = 100
 		self._known_types = { }
 		self._types = { }
+		self._db_to_py_converters = { }
+		self._row_plans = { }
 
 	def _map_type(self, name: str, type_name: str, *type_args: any):
+		if type_name == "enum":
+			# Resolve stored values through a plain dict instead of calling the
+			# enum class, which goes through the EnumType machinery every time
+			(enum_class, ) = type_args
+			type_args = (enum_class, { member.value: member for member in enum_class })
 		self._types[name] = (type_name, ) + type_args
+		self._db_to_py_converters[name] = self._compile_db_to_py_converter(self._types[name])
+		self._row_plans.clear()
+
+	def _decompress_blob(self, value: bytes):
+		# Blobs written before compression was introduced lack the magic and are
+		# returned unchanged
+		if value.startswith(self._COMPRESSED_BLOB_MAGIC):
+			return zlib.decompress(value[len(self._COMPRESSED_BLOB_MAGIC):])
+		return value
+
+	def _compile_db_to_py_converter(self, type_descriptor: tuple):
+		match type_descriptor:
+			case ("enum", enum_class, members_by_value):
+				return members_by_value.__getitem__
+
+			case ("json", ):
+				return self._JSON_DECODER.decode
+
+			case ("utcts", ):
+				# fromisoformat() is implemented in C and, unlike strptime(), does not
+				# interpret a format string; the trailing "Z" yields UTC directly
+				return datetime.datetime.fromisoformat
+
+			case ("limit-blobsize", max_size_bytes):
+				return self._decompress_blob
+
+			case _:
+				raise ValueError(f"Unknown type descriptor: {type_descriptor}")
 
 	def _map_py_to_db_value(self, value: any, type_name: str):
 		if type_name not in self._types:
@@ -59,12 +103,12 @@ class SqliteORM():
 			return value
 
 		match self._types[type_name]:
-			case ("enum", enum_class):
+			case ("enum", enum_class, members_by_value):
 				assert(isinstance(value, enum_class))
 				return value.value
 
 			case ("json", ):
-				return json.dumps(value, sort_keys = True, separators = (",", ":"))
+				return self._JSON_ENCODER.encode(value)
 
 			case ("utcts", ):
 				assert(isinstance(value, datetime.datetime))
@@ -77,6 +121,9 @@ class SqliteORM():
 					half_size = max_size_bytes // 2
 					missing_bytes = len(value) - (2 * half_size)
 					value = value[:half_size] + (f"\n[...kartfire limited size {len(value)} to {max_size_bytes} bytes...]\n").encode("ascii") + value[-half_size:]
+				compressed = self._COMPRESSED_BLOB_MAGIC + zlib.compress(value)
+				if (len(compressed) < len(value)) or value.startswith(self._COMPRESSED_BLOB_MAGIC):
+					return compressed
 				return value
 
 			case _:
@@ -86,22 +133,7 @@ class SqliteORM():
 		if (value is None) or (type_name not in self._types):
 			# No mapping occurs
 			return value
-
-		match self._types[type_name]:
-			case ("enum", enum_class):
-				return enum_class(value)
-
-			case ("json", ):
-				return json.loads(value)
-
-			case ("utcts", ):
-				return datetime.datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo = datetime.UTC)
-
-			case ("limit-blobsize", max_size_bytes):
-				return value
-
-			case _:
-				raise ValueError(f"Unknown type descriptor: {self._types[type_name]}")
+		return self._db_to_py_converters[type_name](value)
 
 	def _map_py_to_db(self, *parameters: tuple[any]) -> tuple[any]:
 		def _map(parameter):
@@ -113,60 +145,134 @@ class SqliteORM():
 				return parameter
 		return tuple(_map(parameter) for parameter in parameters)
 
+	def _row_plan(self, columns: tuple[str], table_names: tuple[str]) -> tuple[tuple[str, "callable | None"]]:
+		# Resolves, once per distinct result shape, which converter (if any)
+		# applies to each column; the first table that maps a column wins
+		key = (columns, table_names)
+		if key not in self._row_plans:
+			plan = [ ]
+			for column in columns:
+				converter = None
+				for table_name in table_names:
+					converter = self._db_to_py_converters.get(f"{table_name}:{column}")
+					if converter is not None:
+						break
+				plan.append((column, converter))
+			self._row_plans[key] = tuple(plan)
+		return self._row_plans[key]
+
+	def _cursor_row_plan(self, table_names: tuple[str]):
+		return self._row_plan(tuple(description[0] for description in (self._cursor.description or ( ))), table_names)
+
+	@staticmethod
+	def _apply_row_plan(plan: tuple, row: tuple):
+		return { column: value if ((converter is None) or (value is None)) else converter(value) for ((column, converter), value) in zip(plan, row) }
+
 	def _map_db_to_py(self, row: sqlite3.Row, *table_names: tuple[str]):
 		if row is None:
 			return None
+		return self._apply_row_plan(self._row_plan(tuple(row.keys()), table_names), row)
 
-		result = { }
-		for (key, value) in dict(row).items():
-			for table_name in table_names:
-				type_name = f"{table_name}:{key}"
-				if type_name in self._types:
-					value = self._map_db_to_py_value(value, type_name)
-					break
-			result[key] = value
-		return result
+	def _table_written(self, table_name: str):
+		# Called whenever rows of a table are written; subclasses that cache
+		# table contents override this to invalidate them
+		pass
 
 	def _insert_many(self, table_name: str, all_values: list[dict], ignore_duplicate: bool = False):
-		fields = list(all_values[0])
-		value_field = f"({','.join([ '?' ] * len(fields))})"
-		query = f"INSERT {'OR IGNORE ' if ignore_duplicate else ''}INTO {table_name} ({','.join(field for field in fields)}) VALUES {','.join([ value_field ] * len(all_values))};"
-		params = [ ]
-		for values in all_values:
-			params += [ self._map_py_to_db_value(values[key], type_name = f"{table_name}:{key}") for key in fields ]
-		self._cursor.execute(query, params)
+		# One prepared statement executed for every row; unlike a single
+		# multi-VALUES statement this is not bounded by SQLITE_MAX_VARIABLE_NUMBER
+		if len(all_values) == 0:
+			return
+		fields = tuple(all_values[0])
+		type_names = [ (field, f"{table_name}:{field}") for field in fields ]
+		rows = [ tuple(self._map_py_to_db_value(values[field], type_name) for (field, type_name) in type_names) for values in all_values ]
+		self._cursor.executemany(self._insert_query(table_name, fields, ignore_duplicate = ignore_duplicate), rows)
+		self._table_written(table_name)
 		self._uncommitted_write_count += len(all_values)
 
-	def _insert(self, table_name: str, values: dict, ignore_duplicate: bool = False):
-		mapped_values = { key: self._map_py_to_db_value(value, type_name = f"{table_name}:{key}") for (key, value) in values.items() }
-		fields = list(mapped_values)
-		values = [ mapped_values[field] for field in fields ]
-		query = f"INSERT {'OR IGNORE ' if ignore_duplicate else ''}INTO {table_name} ({','.join(field for field in fields)}) VALUES ({','.join([ '?' ] * len(fields))});"
-		result = self._cursor.execute(query, values)
+	@classmethod
+	def _insert_query(cls, table_name: str, fields: tuple[str], ignore_duplicate: bool = False, returning: str | None = None):
+		key = (table_name, fields, ignore_duplicate, returning)
+		if key not in cls._INSERT_SQL_CACHE:
+			cls._INSERT_SQL_CACHE[key] = f"INSERT {'OR IGNORE ' if ignore_duplicate else ''}INTO {table_name} ({','.join(fields)}) VALUES ({','.join([ '?' ] * len(fields))}){'' if returning is None else f' RETURNING {returning}'};"
+		return cls._INSERT_SQL_CACHE[key]
+
+	def _insert(self, table_name: str, values: dict, ignore_duplicate: bool = False, returning: str | None = None):
+		fields = tuple(values)
+		values = [ self._map_py_to_db_value(values[field], type_name = f"{table_name}:{field}") for field in fields ]
+		result = self._cursor.execute(self._insert_query(table_name, fields, ignore_duplicate = ignore_duplicate, returning = returning), values)
+		self._table_written(table_name)
 		self._uncommitted_write_count += 1
-		return result.lastrowid
+		if returning is None:
+			return result.lastrowid
+		row = result.fetchone()
+		return None if (row is None) else row[0]
 
 	def _mapped_execute(self, query: str, *parameters: tuple[any]):
 		self._cursor.execute(query, self._map_py_to_db(*parameters))
 		return self
 
+	@contextlib.contextmanager
+	def _tuple_rows(self):
+		# The compiled row plan already knows the column names, so mapped
+		# fetches skip constructing a sqlite3.Row object for every row
+		self._cursor.row_factory = None
+		try:
+			yield
+		finally:
+			self._cursor.row_factory = sqlite3.Row
+
 	def _mapped_fetchone(self, *table_names: tuple[str]):
-		return self._map_db_to_py(self._cursor.fetchone(), *table_names)
+		with self._tuple_rows():
+			row = self._cursor.fetchone()
+		if row is None:
+			return None
+		return self._apply_row_plan(self._cursor_row_plan(table_names), row)
 
 	def _mapped_fetchall(self, *table_names: tuple[str]):
-		return [ self._map_db_to_py(row, *table_names) for row in self._cursor.fetchall() ]
-
-	def _increase_uncommitted_write_count(self):
-		self._uncommitted_write_count += 1
+		plan = self._cursor_row_plan(table_names)
+		with self._tuple_rows():
+			rows = self._cursor.fetchall()
+		return [ self._apply_row_plan(plan, row) for row in rows ]
+
+	@contextlib.contextmanager
+	def _savepoint(self, name: str):
+		self._cursor.execute(f"SAVEPOINT {name};")
+		try:
+			yield
+		except BaseException:
+			self._cursor.execute(f"ROLLBACK TO {name};")
+			self._cursor.execute(f"RELEASE {name};")
+			raise
+		self._cursor.execute(f"RELEASE {name};")
+
+	def _increase_uncommitted_write_count(self, count: int = 1):
+		self._uncommitted_write_count += count
 
 	def opportunistic_commit(self):
 		if self._uncommitted_write_count > self._max_uncommitted_writes:
 			self.commit()
 
+	def analyze(self):
+		self._cursor.execute("ANALYZE;")
+
+	def optimize(self):
+		self._cursor.execute("PRAGMA optimize;")
+
+	def checkpoint(self):
+		# A checkpoint cannot complete while our own write transaction is open
+		self.commit()
+		self._cursor.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+
 	def commit(self):
 		self._conn.commit()
 		self._uncommitted_write_count = 0
 
+	def close(self):
+		self.optimize()
+		self.commit()
+		self._conn.close()
+
 if __name__ == "__main__":
 	import enum
 	import contextlib
@@ -51,7 +51,7 @@ class StateFile():
 
 		# Run it.
 		self._state[path] = {
-			"last_run": datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"),
+			"last_run": datetime.datetime.now(datetime.UTC).strftime("%Y-%m-%dT%H:%M:%SZ"),
 			"commit": commit,
 		}
 		return True
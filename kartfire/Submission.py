@@ -33,9 +33,11 @@ class Submission():
 		if not os.path.isdir(self._submission_dir):
 			raise InvalidSubmissionException(f"{self._submission_dir} is not a directory")
 
-	@property
+	@functools.cached_property
 	def shortname(self):
-		return os.path.basename(self._submission_dir)
+		# The directory is normalized by realpath(), so it never ends in a
+		# separator and the last component can be split off directly
+		return self._submission_dir.rpartition(os.sep)[2] or self._submission_dir
 
 	@property
 	def requires_build_step(self):
@@ -75,7 +77,7 @@ class Submission():
 		}
 
 	def __str__(self):
-		short_dir = os.path.basename(self._submission_dir)
+		short_dir = self.shortname
 		meta = self.meta_info
 		if ("json" in meta) and ("text" in meta["json"]):
 			return f"{short_dir}: {meta['json']['text']}"
@@ -19,12 +19,14 @@
 #
 #	Johannes Bauer <JohannesBauer@gmx.de>
 
+import io
 import os
 import tempfile
 import asyncio
 import logging
 import json
 import time
+import datetime
 import dataclasses
 from .Tools import SystemTools
 from .Enums import TestrunStatus
@@ -126,7 +128,13 @@ class TestRunner():
 		return concurrent
 
 	def _evaluate_docker_stdout(self, exec_result: "ExecutionResult", json_line_callback: "callable | None" = None, trusted_msg_callback: "callable | None" = None):
-		for stdout_line in exec_result.stdout.decode("utf-8", errors = "ignore").split("\n"):
+		# Decode and split the output lazily instead of materializing the whole
+		# decoded text and its list of lines; only JSON objects are of interest,
+		# so anything else is skipped before invoking the decoder
+		stdout_lines = io.TextIOWrapper(io.BytesIO(exec_result.stdout), encoding = "utf-8", errors = "ignore", newline = "\n")
+		for stdout_line in stdout_lines:
+			if not stdout_line.lstrip().startswith("{"):
+				continue
 			try:
 				json_data = json.loads(stdout_line)
 				if not isinstance(json_data, dict):
@@ -204,9 +212,12 @@ class TestRunner():
 		status_code = await container.wait_timeout(timeout_secs)
 		runtime_secs_container = time.monotonic() - t0
 
-		# Send SIGKILL to container immediately and wait for it to actually finish
-		await container.stop(gracetime = 0)
-		await container.wait()
+		if status_code is None:
+			# Timed out: send SIGKILL to container immediately and wait for it
+			# to actually finish. Otherwise it has already exited and there is
+			# no need to spawn two more docker processes.
+			await container.stop(gracetime = 0)
+			await container.wait()
 
 		if post_run_hook is not None:
 			post_run_result = await post_run_hook(container, status_code)
@@ -291,7 +302,8 @@ class TestRunner():
 
 		build_constraints = BuildConstraints(runtime_allowance_secs = self._config.max_build_time_secs)
 		container_image_metadata = ContainerImageMetadata.collect(self._config.docker_container, self.docker)
-		multirun_id = self._db.create_multirun(submission, build_constraints = build_constraints, container_image_metadata = container_image_metadata)
+		build_start_utcts = datetime.datetime.now(datetime.UTC)
+		multirun_id = self._db.create_multirun(submission, build_constraints = build_constraints, container_image_metadata = container_image_metadata, now = build_start_utcts)
 		self._db.commit()
 
 		async with self.docker as docker:
@@ -318,15 +330,13 @@ class TestRunner():
 					run_result = await self._execute_run_step(docker, submission, collection, base_image_name = commited_base_image_id)
 					evaluation = collection.prepare_evaluation()
 					self._evaluate_docker_stdout(run_result, evaluation.received_reply, evaluation.received_trusted_msg)
-					for (tc_id, test_result_status, reply) in evaluation.test_failures:
-						self._db.insert_testfailure(run_id, tc_id, test_result_status, reply)
-					for (test_result_status, count) in evaluation.test_summary.items():
-						self._db.insert_testsummary(run_id, test_result_status, count)
+					self._db.insert_testfailures_bulk(run_id, list(evaluation.test_failures))
+					self._db.insert_testsummaries_bulk(run_id, list(evaluation.test_summary.items()))
 					self._db.close_testrun(run_id, run_result)
 					self._db.commit()
 					for callback in self._submission_run_finished_callbacks:
 						callback(submission, run_id)
-		self._db.close_multirun(multirun_id)
+		self._db.close_multirun(multirun_id, build_start_utcts = build_start_utcts)
 		self._db.commit()
 
 		for callback in self._submission_multirun_finished_callbacks:
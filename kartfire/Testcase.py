@@ -81,24 +81,21 @@ class TestcaseCollectionEvaluation():
 			# Given the same reply twice, ignore.
 			return
 
-		# Determine status
+		# Determine status; passing is the common case and needs nothing else
 		testcase = self._tc_collection[tc_id]
+		reply = json_data["reply"]
 		if testcase.correct_reply is None:
-			# No response available
-			test_result_status = TestresultStatus.Indeterminate
-		elif testcase.correct_reply == json_data["reply"]:
-			test_result_status = TestresultStatus.Pass
+			# No response available. Always save the reply so that we can build
+			# a reference from it.
+			self._status_by_tc_id[tc_id] = TestresultStatus.Indeterminate
+			self._recorded_replies[TestresultStatus.Indeterminate][tc_id] = reply
+		elif testcase.correct_reply == reply:
+			self._status_by_tc_id[tc_id] = TestresultStatus.Pass
 		else:
-			test_result_status = TestresultStatus.Fail
-		self._status_by_tc_id[tc_id] = test_result_status
-
-		# Do we need to save the reply?
-		if ((test_result_status == TestresultStatus.Indeterminate) or
-			((test_result_status == TestresultStatus.Fail) and (len(self._recorded_replies[TestresultStatus.Fail]) < self._record_max_failed_reply_count))):
-			# Either it's indeterminate (then we always save the reply so that
-			# we can build a reference) or it's Fail (then we only collect the
-			# first 5 or so)
-			self._recorded_replies[test_result_status][tc_id] = json_data["reply"]
+			self._status_by_tc_id[tc_id] = TestresultStatus.Fail
+			# Only collect the first 5 or so failed replies
+			if len(self._recorded_replies[TestresultStatus.Fail]) < self._record_max_failed_reply_count:
+				self._recorded_replies[TestresultStatus.Fail][tc_id] = reply
 
 	@property
 	def test_failures(self):
@@ -25,16 +25,20 @@ import hashlib
 import base64
 import json
 import asyncio
+import functools
 import subprocess
 import collections
 import dataclasses
+import tzlocal
 from .Exceptions import InternalError, SubprocessRunError
 from .CmdlineEscape import CmdlineEscape
 
 class JSONTools():
+	_CANONICAL_ENCODER = json.JSONEncoder(separators = (",", ":"), sort_keys = True)
+
 	@classmethod
 	def canonicalize(cls, serializable_object):
-		canonical_representation = json.dumps(serializable_object, separators = (",", ":"), sort_keys = True)
+		canonical_representation = cls._CANONICAL_ENCODER.encode(serializable_object)
 		return canonical_representation
 
 	@classmethod
@@ -58,6 +62,13 @@ class SystemTools():
 			raise InternalError("Unable to determine total amount of available RAM.")
 		return int(rematch.groupdict()["mem_kib"]) // 1024
 
+	@classmethod
+	@functools.cache
+	def get_local_timezone(cls):
+		# tzlocal consults the environment and /etc/localtime on every call,
+		# the result does not change during the lifetime of the process
+		return tzlocal.get_localzone()
+
 class ExecTools():
 	@classmethod
 	async def async_check_output(cls, cmd: list):